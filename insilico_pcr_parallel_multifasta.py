@@ -18,32 +18,64 @@ workers as CPUs available (os.cpu_count()).
 from pathlib import Path
 import argparse
 import csv
+import functools
+import itertools
+import mmap
 import re
 from typing import List, Tuple, Dict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import multiprocessing
+from multiprocessing import shared_memory
 import os
 
+try:
+    import numpy as np
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:  # optional: fall back to the pure-Python matcher
+    np = None
+    _NUMBA_AVAILABLE = False
+
+try:
+    import ahocorasick
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:  # optional: without it every primer is fully scanned
+    _AHOCORASICK_AVAILABLE = False
+
+try:
+    import regex
+    _REGEX_AVAILABLE = True
+except ImportError:  # optional: fuzzy-regex prefilter for the pure-Python path
+    _REGEX_AVAILABLE = False
+
 # -------------------------
 # FASTA reader
 # -------------------------
+# uppercases sequence bytes; whitespace/CR/LF are deleted in the same translate() pass
+_FASTA_UPPER = bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz', b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_FASTA_STRIP = b' \t\r\n'
+
 def read_fasta(path: Path):
-    """Yield (seq_id, sequence) for each record in a FASTA file (uppercased)."""
-    with open(path, 'r') as fh:
-        seq_id = None
-        seq_parts = []
-        for line in fh:
-            line = line.rstrip('\n')
-            if not line:
-                continue
-            if line.startswith('>'):
-                if seq_id is not None:
-                    yield seq_id, ''.join(seq_parts).upper()
-                seq_id = line[1:].split()[0]
-                seq_parts = []
-            else:
-                seq_parts.append(line.strip())
-        if seq_id is not None:
-            yield seq_id, ''.join(seq_parts).upper()
+    """Yield (seq_id, sequence_bytes) for each record in a FASTA file (uppercased)."""
+    with open(path, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            size = len(buf)
+            start = 0 if buf[:1] == b'>' else buf.find(b'\n>')
+            if start != -1 and buf[start:start + 1] == b'\n':
+                start += 1
+            while start != -1:
+                nl = buf.find(b'\n', start)
+                if nl == -1:
+                    nl = size
+                nxt = buf.find(b'\n>', nl)
+                body = buf[nl:size if nxt == -1 else nxt].translate(_FASTA_UPPER, _FASTA_STRIP)
+                seq_id = buf[start + 1:nl].split()[0].decode('utf-8', 'replace')
+                yield seq_id, body
+                start = -1 if nxt == -1 else nxt + 1
 
 # -------------------------
 # IUPAC & matching helpers
@@ -55,32 +87,268 @@ IUPAC = {
     'H': {'A','C','T'}, 'V': {'A','C','G'}, 'N': {'A','C','G','T'}
 }
 
-def revcomp(seq: str) -> str:
-    comp = {'A':'T','T':'A','G':'C','C':'G','U':'A','N':'N'}
-    return ''.join(comp.get(b, 'N') for b in seq[::-1].upper())
-
 def primer_allowed_set(primer: str):
     return [IUPAC.get(ch, {'A','C','G','T'}) for ch in primer.upper()]
 
-def count_mismatches(seg: str, allowed_sets: List[set]) -> int:
-    mism = 0
-    for b, allow in zip(seg, allowed_sets):
-        if b not in allow:
-            mism += 1
-    return mism
+def _compile_primer_masks(primer: str) -> Dict[int, int]:
+    """Return {base_byte: mask} where bit j is set if the base is allowed at primer position j."""
+    masks = {ord(b): 0 for b in 'ACGT'}
+    for j, allow in enumerate(primer_allowed_set(primer)):
+        for b in allow:
+            masks[ord(b)] |= 1 << j
+    return masks
+
+def _revcomp_masks(masks: Dict[int, int], L: int) -> Dict[int, int]:
+    """Masks of the reverse complement: swap complementary bases and bit-reverse within L bits."""
+    return {ord(b): int(format(masks[ord(c)], f'0{L}b')[::-1], 2) for b, c in zip('ACGT', 'TGCA')}
 
-def find_approx_matches(seq: str, primer: str, max_mismatch: int) -> List[Tuple[int,int,int]]:
-    L = len(primer)
-    if L == 0 or len(seq) < L:
+def _masks_allowed_sets(masks: Dict[int, int], L: int) -> List[set]:
+    """Per-position allowed base sets (as primer_allowed_set) recovered from masks."""
+    return [{chr(b) for b, m in masks.items() if m >> j & 1} for j in range(L)]
+
+def pair_masks(pair: Dict) -> List[Tuple[Dict[int, int], int]]:
+    """[(masks, L)] for the forward primer and for the reverse primer's reverse complement."""
+    fwd_pr = pair['forward']
+    rev_pr = pair['reverse']
+    return [(_compile_primer_masks(fwd_pr), len(fwd_pr)),
+            (_revcomp_masks(_compile_primer_masks(rev_pr), len(rev_pr)), len(rev_pr))]
+
+# Exact matching (max_mismatch == 0) of primers with few IUPAC expansions uses bytes.find,
+# whose C fast search (memchr-based) beats any per-base loop.
+_MAX_EXACT_VARIANTS = 8
+
+def exact_variants(masks: Dict[int, int], L: int):
+    """Return every concrete sequence (bytes) the primer allows, or None if there are more than _MAX_EXACT_VARIANTS."""
+    allowed = _masks_allowed_sets(masks, L)
+    n = 1
+    for allow in allowed:
+        n *= len(allow)
+        if n > _MAX_EXACT_VARIANTS:
+            return None
+    return [''.join(v).encode() for v in itertools.product(*(sorted(a) for a in allowed))]
+
+def find_exact_matches(seq, variants: List[bytes], L: int) -> List[Tuple[int,int,int]]:
+    """All (start, end, 0) where one of the `variants` occurs in `seq`, sorted by start."""
+    if L == 0:
         return []
-    allowed = primer_allowed_set(primer)
+    if not isinstance(seq, bytes):
+        seq = bytes(seq)
     hits = []
-    # naive sliding window (fast enough for bacterial-size sequences)
-    for i in range(0, len(seq) - L + 1):
-        seg = seq[i:i+L]
-        mm = count_mismatches(seg, allowed)
+    for prim in variants:
+        i = seq.find(prim)
+        while i != -1:
+            hits.append((i, i + L, 0))
+            i = seq.find(prim, i + 1)
+    if len(variants) > 1:
+        hits.sort()
+    return hits
+
+def gen_matcher(masks: Dict[int, int], L: int, max_mismatch: int):
+    """
+    Generate a matcher specialised for one primer and mismatch budget:
+        match(seq, positions, out) appends (i, i+L, mm) for each start i in `positions`
+        whose window in the bytes-like `seq` has mm <= max_mismatch.
+    The per-position loop is unrolled and allowed-base sets become constant frozensets,
+    so CPython runs straight-line comparisons with an early `continue`.
+    """
+    src = ["def match(seq, positions, out):",
+           "    append = out.append",
+           "    for i in positions:",
+           "        mm = 0"]
+    for j, allow in enumerate(_masks_allowed_sets(masks, L)):
+        codes = sorted(ord(b) for b in allow)
+        at = f"seq[i + {j}]" if j else "seq[i]"
+        test = f"{at} != {codes[0]}" if len(codes) == 1 else f"{at} not in {{{', '.join(map(str, codes))}}}"
+        if max_mismatch == 0:
+            src.append(f"        if {test}: continue")
+        else:
+            src += [f"        if {test}:",
+                    "            mm += 1",
+                    f"            if mm > {max_mismatch}: continue"]
+    src.append(f"        append((i, i + {L}, mm))")
+    namespace = {}
+    exec('\n'.join(src), namespace)
+    return namespace['match']
+
+def find_generated_matches(seq, matcher, L: int) -> List[Tuple[int,int,int]]:
+    """Return [(start, end, mismatches)] for every window of `seq` accepted by a gen_matcher() function."""
+    hits = []
+    if matcher is not None and L and len(seq) >= L:
+        matcher(seq, range(len(seq) - L + 1), hits)
+    return hits
+
+# -------------------------
+# Numba-accelerated matcher (optional)
+# -------------------------
+# The kernel reads the raw uppercase sequence bytes (zero-copy, e.g. straight out of
+# shared memory) and maps each byte to a base code (A=0, C=1, G=2, T=3, other=4)
+# through a lookup table; each primer position is a 4-bit mask of allowed codes.
+if _NUMBA_AVAILABLE:
+    _ENCODE_LUT = np.full(256, 4, dtype=np.int8)
+    for _code, _base in enumerate('ACGT'):
+        _ENCODE_LUT[ord(_base)] = _code
+        _ENCODE_LUT[ord(_base.lower())] = _code
+
+    @njit(cache=True, boundscheck=False, nogil=True)
+    def _scan_kernel(seq, lut, prim_bits, max_mm):
+        n = seq.shape[0]
+        L = prim_bits.shape[0]
+        m = n - L + 1
+        starts = np.empty(m, dtype=np.int64)
+        mms = np.empty(m, dtype=np.int64)
+        cnt = 0
+        for i in range(m):
+            mm = 0
+            for j in range(L):
+                if not (prim_bits[j] >> lut[seq[i + j]]) & 1:
+                    mm += 1
+                    if mm > max_mm:
+                        break
+            if mm <= max_mm:
+                starts[cnt] = i
+                mms[cnt] = mm
+                cnt += 1
+        return starts[:cnt], mms[:cnt]
+
+def encode_primer(masks: Dict[int, int], L: int):
+    """Encode primer masks as a uint8 array of allowed-base-code bitmasks (one per position)."""
+    bits = np.zeros(L, dtype=np.uint8)
+    for code, b in enumerate('ACGT'):
+        m = masks[ord(b)]
+        for j in range(L):
+            if m >> j & 1:
+                bits[j] |= 1 << code
+    return bits
+
+# Contigs longer than this are split into overlapping tiles scanned by threads
+# (the kernel releases the GIL) when a worker has a tile pool.
+_TILE_MIN_LEN = 5_000_000
+_MAX_JIT_THREADS = 4
+
+def _run_kernel_tiled(arr, prim_bits, max_mismatch: int, tile_pool, n_tiles: int):
+    """Return [(offset, _scan_kernel(arr[offset:...], ...))] over the whole sequence or over parallel tiles."""
+    L = prim_bits.shape[0]
+    m = arr.shape[0] - L + 1
+    if tile_pool is None or n_tiles < 2 or arr.shape[0] < _TILE_MIN_LEN:
+        return [(0, _scan_kernel(arr, _ENCODE_LUT, prim_bits, max_mismatch))]
+    # tile k covers start positions [t0, t0 + T); it overlaps the next tile by L-1 bases
+    T = -(-m // n_tiles)
+    tile_starts = range(0, m, T)
+    futures = [tile_pool.submit(_scan_kernel, arr[t0:t0 + T + L - 1], _ENCODE_LUT, prim_bits, max_mismatch)
+               for t0 in tile_starts]
+    return [(t0, fut.result()) for t0, fut in zip(tile_starts, futures)]
+
+def find_approx_matches_jit(seq, prim_bits, max_mismatch: int, tile_pool=None, n_tiles: int = 1) -> List[Tuple[int,int,int]]:
+    """
+    Same result as find_generated_matches; `seq` is any bytes-like buffer, `prim_bits` from encode_primer.
+    With a `tile_pool` (ThreadPoolExecutor), long sequences are scanned as `n_tiles` parallel tiles.
+    """
+    L = prim_bits.shape[0]
+    if L == 0 or len(seq) < L or max_mismatch < 0:
+        return []
+    arr = np.frombuffer(seq, dtype=np.uint8)
+    hits = []
+    for t0, (starts, mms) in _run_kernel_tiled(arr, prim_bits, max_mismatch, tile_pool, n_tiles):
+        hits.extend((t0 + i, t0 + i + L, mm) for i, mm in zip(starts.tolist(), mms.tolist()))
+    return hits
+
+def _warmup_jit():
+    """Compile (or load from cache) the kernel once before workers are started."""
+    find_approx_matches_jit(b'ACGTN', encode_primer(_compile_primer_masks('AC'), 2), 1)
+
+# -------------------------
+# Seed-and-extend via Aho-Corasick (optional)
+# -------------------------
+# Pigeonhole: a hit with <= k mismatches has at least one of k+1 disjoint primer
+# segments matching exactly, so exact seed hits enumerate every candidate start.
+_MIN_SEED_LEN = 6
+_MAX_SEED_VARIANTS = 256
+
+def primer_seeds(allowed: List[set], max_mismatch: int):
+    """Return [(seed, offset_in_primer)] for a primer's allowed sets, or None if it should be fully scanned."""
+    L = len(allowed)
+    nseg = max_mismatch + 1
+    if max_mismatch < 0 or L // nseg < _MIN_SEED_LEN:
+        return None
+    seeds = []
+    for s in range(nseg):
+        a, b = s * L // nseg, (s + 1) * L // nseg
+        for variant in itertools.product(*(sorted(x) for x in allowed[a:b])):
+            seeds.append((''.join(variant), a))
+            if len(seeds) > _MAX_SEED_VARIANTS:
+                return None
+    return seeds
+
+def build_seed_automaton(primers: List[Tuple[Dict[int, int], int]], max_mismatch: int):
+    """
+    Build one automaton over the seeds of all `primers` ([(masks, L)], see pair_masks).
+    Returns (automaton, seeded_primer_indices), or None if no primer can be seeded.
+    """
+    if not _AHOCORASICK_AVAILABLE:
+        return None
+    words = {}
+    seeded = []
+    for idx, (masks, L) in enumerate(primers):
+        if max_mismatch == 0 and exact_variants(masks, L) is not None:
+            continue  # bytes.find fast path
+        seeds = primer_seeds(_masks_allowed_sets(masks, L), max_mismatch)
+        if seeds is None:
+            continue
+        seeded.append(idx)
+        for seed, offset in seeds:
+            # value: (primer index, distance from seed end back to primer start)
+            words.setdefault(seed, []).append((idx, offset + len(seed) - 1))
+    if not seeded:
+        return None
+    automaton = ahocorasick.Automaton()
+    for seed, entries in words.items():
+        automaton.add_word(seed, entries)
+    automaton.make_automaton()
+    return automaton, tuple(seeded)
+
+def find_seeded_matches(seq, seed_index, matchers: List, lengths: List[int]) -> Dict[int, List[Tuple[int,int,int]]]:
+    """
+    Scan the bytes-like `seq` once for all seeds, verify candidates; returns {primer_idx: hits}
+    for seeded primers. `matchers[i]` is gen_matcher() for primer i, whose length is `lengths[i]`.
+    """
+    automaton, seeded = seed_index
+    text = str(seq, 'latin-1')  # pyahocorasick matches str keys
+    cands = {idx: set() for idx in seeded}
+    for end, entries in automaton.iter(text):
+        for idx, delta in entries:
+            cands[idx].add(end - delta)
+    n = len(seq)
+    hits = {}
+    for idx in seeded:
+        L = lengths[idx]
+        out = []
+        matchers[idx](seq, [i for i in sorted(cands[idx]) if 0 <= i <= n - L], out)
+        hits[idx] = out
+    return hits
+
+# -------------------------
+# Fuzzy regex scan via the `regex` module (optional)
+# -------------------------
+# Without Numba, a substitution-only fuzzy pattern ([..] class per primer position,
+# {s<=k}) lets regex's C matcher enumerate candidate starts; each is then verified.
+def compile_primer_regex(allowed: List[set], max_mismatch: int):
+    """Compile the overlapped-search fuzzy pattern for a primer's allowed base sets."""
+    classes = b''.join(b'[' + ''.join(sorted(a)).encode() + b']' for a in allowed)
+    return regex.compile(b'(?:' + classes + b'){s<=%d}' % max_mismatch)
+
+def find_regex_matches(seq, pattern, masks: Dict[int, int], L: int, max_mismatch: int) -> List[Tuple[int,int,int]]:
+    """Same result as find_generated_matches, using a compile_primer_regex() pattern as the scanner."""
+    if L == 0 or len(seq) < L or max_mismatch < 0:
+        return []
+    hits = []
+    for match in pattern.finditer(seq, overlapped=True):
+        i = match.start()
+        mm = 0
+        for j in range(L):
+            if not masks.get(seq[i + j], 0) >> j & 1:
+                mm += 1
         if mm <= max_mismatch:
-            hits.append((i, i+L, mm))
+            hits.append((i, i + L, mm))
     return hits
 
 # -------------------------
@@ -121,68 +389,316 @@ def parse_primer_csv(path: Path):
 # -------------------------
 # Utilities
 # -------------------------
+FASTA_EXTENSIONS = {'.fa', '.fasta', '.fna', '.ffn'}
+
+# Per-pair FASTA files are written by a background thread; at most this many may be queued.
+_MAX_PENDING_WRITES = 64
+
+def write_bytes(path: Path, data: bytes):
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+def _report_write(path: Path, n_amplicons: int, future):
+    """Done-callback for a queued write_bytes(); failures surface later via future.result()."""
+    if future.exception() is None:
+        print(f"Wrote {n_amplicons} amplicons -> {path}")
+
 def safe_name(s: str) -> str:
     return re.sub(r'[^A-Za-z0-9_.-]+', '_', s)
 
-def wrap_seq(s: str, width: int = 80) -> str:
-    return '\n'.join(s[i:i+width] for i in range(0, len(s), width))
+def chunk_tasks(tasks: List, work: List[int], budget: float) -> List[List]:
+    """Split longest-first `tasks` into consecutive chunks whose summed estimated `work` stays within `budget`."""
+    chunks = []
+    chunk_work = 0
+    for task, w in zip(tasks, work):
+        if chunks and chunk_work + w <= budget:
+            chunks[-1].append(task)
+            chunk_work += w
+        else:
+            chunks.append([task])
+            chunk_work = w
+    return chunks
+
+# -------------------------
+# Shared genome store: each FASTA is parsed once by the master into shared memory
+# -------------------------
+# Files are packed into blocks of about this size, so open fds stay few even with thousands of genomes.
+_SHM_BLOCK_BYTES = 1 << 30
+
+def _shm_free_bytes():
+    """Free space on the /dev/shm tmpfs behind SharedMemory, or None where it cannot be measured."""
+    try:
+        st = os.statvfs('/dev/shm')
+    except (AttributeError, OSError):
+        return None
+    return st.f_bavail * st.f_frsize
+
+def _shm_block_cap() -> int:
+    """Size limit for the next block; half the free /dev/shm space, as it is built while the previous one is live."""
+    free = _shm_free_bytes()
+    return _SHM_BLOCK_BYTES if free is None else min(_SHM_BLOCK_BYTES, free // 2)
+
+def load_fasta_shared(batch: List[Tuple[str, List[Tuple[str, bytes]]]]):
+    """
+    Pack parsed FASTA files [(fasta_path, records), ...] into one SharedMemory block;
+    returns (shm, [(fasta_path, [(seq_id, offset, length), ...]), ...]) with offsets into the block.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(sum(len(seq) for _, records in batch
+                                                               for _, seq in records), 1))
+    files = []
+    offset = 0
+    for path, records in batch:
+        contigs = []
+        for seq_id, seq in records:
+            shm.buf[offset:offset + len(seq)] = seq
+            contigs.append((seq_id, offset, len(seq)))
+            offset += len(seq)
+        files.append((path, contigs))
+    return shm, files
+
+@contextmanager
+def shared_fasta_store(fasta_paths: List[str]):
+    """
+    Yield (batches, release). `batches` parses the readable files lazily and yields one block at a time
+    as (shm, [(fasta_path, shm_name, contigs), ...]). A batch that does not fit in /dev/shm comes with
+    shm and shm_name None (offsets None) and is parsed by the workers instead.
+    Call release(shm) once a block's tasks are done; blocks still live are unlinked on exit.
+    """
+    live = []
+
+    def release(shm):
+        if shm is not None:
+            live.remove(shm)
+            shm.close()
+            shm.unlink()
+
+    def pack(batch):
+        # filling a block past the tmpfs limit raises SIGBUS, so recheck the space right before creating it
+        free = _shm_free_bytes()
+        if free is not None and sum(len(seq) for _, records in batch for _, seq in records) > free:
+            print(f"[WARN] {len(batch)} FASTA file(s) do not fit in /dev/shm; workers will read them directly")
+            return None, [(path, None, [(seq_id, None, len(seq)) for seq_id, seq in records])
+                          for path, records in batch]
+        shm, files = load_fasta_shared(batch)
+        live.append(shm)
+        return shm, [(path, shm.name, contigs) for path, contigs in files]
+
+    def batches():
+        batch, batch_size, cap = [], 0, _shm_block_cap()
+        for path in fasta_paths:
+            try:
+                records = list(read_fasta(Path(path)))
+            except Exception as e:
+                print(f"[ERROR] reading {path} failed: {e}")
+                continue
+            size = sum(len(seq) for _, seq in records)
+            if batch and batch_size + size > cap:
+                yield pack(batch)
+                batch, batch_size, cap = [], 0, _shm_block_cap()
+            batch.append((path, records))
+            batch_size += size
+        if batch:
+            yield pack(batch)
+
+    try:
+        yield batches(), release
+    finally:
+        for shm in live:
+            shm.close()
+            shm.unlink()
+
+_ATTACHED_SHM = {}
+
+def _attach_shm(name: str):
+    """Attach to a master-created SharedMemory block, dropping this worker's mappings of earlier blocks."""
+    shm = _ATTACHED_SHM.get(name)
+    if shm is None:
+        # blocks are scanned one after another; unmapping finished ones lets the master's unlink free them
+        for old in list(_ATTACHED_SHM):
+            try:
+                _ATTACHED_SHM[old].close()
+            except BufferError:
+                continue
+            del _ATTACHED_SHM[old]
+        shm = _ATTACHED_SHM[name] = shared_memory.SharedMemory(name=name)
+    return shm
+
+# -------------------------
+# NUMA placement (Linux only)
+# -------------------------
+def _parse_cpulist(text: str) -> List[int]:
+    """Parse a sysfs CPU/node list such as '0-3,8-11'."""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        lo, _, hi = part.partition('-')
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+def numa_node_cpus() -> List[List[int]]:
+    """
+    CPUs of each online NUMA node, restricted to this process's affinity.
+    Returns [] on non-Linux systems or when the topology cannot be read.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return []
+    base = '/sys/devices/system/node'
+    try:
+        allowed = os.sched_getaffinity(0)
+        with open(f'{base}/online') as fh:
+            nodes = _parse_cpulist(fh.read())
+        node_cpus = []
+        for node in nodes:
+            with open(f'{base}/node{node}/cpulist') as fh:
+                cpus = [c for c in _parse_cpulist(fh.read()) if c in allowed]
+            if cpus:
+                node_cpus.append(cpus)
+        return node_cpus
+    except (OSError, ValueError):
+        return []
+
+def _pin_worker_to_numa_node(worker_counter, node_cpus: List[List[int]]):
+    """Pin this worker to one NUMA node (round-robin by start order) so its scratch memory stays node-local."""
+    with worker_counter.get_lock():
+        worker_idx = worker_counter.value
+        worker_counter.value += 1
+    try:
+        os.sched_setaffinity(0, node_cpus[worker_idx % len(node_cpus)])
+    except OSError:
+        pass
 
 # -------------------------
-# Worker: process a single primer pair across all FASTA files
+# Worker: process a single primer pair against a single FASTA file
 # -------------------------
-def process_pair(pair: Dict, fasta_paths: List[str], max_mismatch: int, min_len: int, max_len: int):
+# Per-process state installed once by the pool initializer, so tasks only carry indices.
+_WORKER_STATE = {}
+
+def _init_worker(pairs: List[Dict], primer_masks: List, seed_indexes: List, params: Dict,
+                 worker_counter=None, node_cpus=None):
+    """
+    Pool initializer.
+    `primer_masks[i]` is pair_masks(pairs[i]) and `seed_indexes[i]` its build_seed_automaton() result;
+    `params` holds max_mismatch, min_len and max_len.
+    On multi-node machines `worker_counter`/`node_cpus` spread workers across NUMA nodes.
+    """
+    if worker_counter is not None and node_cpus:
+        _pin_worker_to_numa_node(worker_counter, node_cpus)
+    _WORKER_STATE.update(pairs=pairs, primer_masks=primer_masks, seed_indexes=seed_indexes, params=params)
+    _WORKER_STATE['matchers'] = [
+        [gen_matcher(masks, L, params['max_mismatch']) if params['max_mismatch'] >= 0 else None for masks, L in pm]
+        for pm in primer_masks]
+    _WORKER_STATE['exact_variants'] = [
+        [exact_variants(masks, L) if params['max_mismatch'] == 0 else None for masks, L in pm]
+        for pm in primer_masks]
+    _WORKER_STATE['regex'] = [
+        [compile_primer_regex(_masks_allowed_sets(masks, L), params['max_mismatch'])
+         if _REGEX_AVAILABLE and not _NUMBA_AVAILABLE and params['max_mismatch'] >= 0 else None
+         for masks, L in pm]
+        for pm in primer_masks]
+    _WORKER_STATE['tile_pool'] = None
+    if _NUMBA_AVAILABLE and params.get('jit_threads', 1) > 1:
+        _WORKER_STATE['tile_pool'] = ThreadPoolExecutor(max_workers=params['jit_threads'])
+    if _NUMBA_AVAILABLE:
+        _WORKER_STATE['prim_bits'] = [[encode_primer(masks, L) for masks, L in pm] for pm in primer_masks]
+
+def process_pair_on_file(pair_idx: int, fasta_entry: Tuple):
     """
-    Runs in a worker process.
-    Returns: (pair_id, list_of_amplicons)
+    Runs in a worker process (see _init_worker).
+    `fasta_entry` is one (fasta_path, shm_name, contigs) entry from a shared_fasta_store() batch;
+    contig sequences are read as zero-copy views of its shared-memory block.
+    Returns: (pair_id, sample_name, list_of_amplicons)
     Each amplicon is dict with keys:
-      sample_name, seq_id, fwd_start, fwd_end, rev_start, rev_end, fwd_mm, rev_mm, amplicon_seq, fwd_primer, rev_primer
+      sample_name, seq_id, seq_offset, fwd_start, fwd_end, rev_start, rev_end, fwd_mm, rev_mm, fwd_primer, rev_primer
+    The amplicon sequence itself is not returned; the master slices it from the shared block
+    (contig starts at `seq_offset`), which keeps it out of the result pickle. Files that did not
+    fit in shared memory (shm_name None) are parsed here and carry an `amplicon_sequence` key instead.
     """
+    pair = _WORKER_STATE['pairs'][pair_idx]
     pair_id = pair['pair_id']
     fwd_pr = pair['forward']
     rev_pr = pair['reverse']
-    revrc = revcomp(rev_pr)
+    # reverse primer is matched on the + strand via its reverse-complement masks
+    primers = _WORKER_STATE['primer_masks'][pair_idx]
+    seed_index = _WORKER_STATE['seed_indexes'][pair_idx]
+    matchers = _WORKER_STATE['matchers'][pair_idx]
+    exact = _WORKER_STATE['exact_variants'][pair_idx]
+    patterns = _WORKER_STATE['regex'][pair_idx]
+    params = _WORKER_STATE['params']
+    if _NUMBA_AVAILABLE:
+        prim_bits = _WORKER_STATE['prim_bits'][pair_idx]
+        tile_pool = _WORKER_STATE['tile_pool']
+        n_tiles = params['jit_threads']
+    max_mismatch, min_len, max_len = params['max_mismatch'], params['min_len'], params['max_len']
 
+    fasta_path, shm_name, contigs = fasta_entry
+    fasta_p = Path(fasta_path)
+    sample_name = fasta_p.stem
     result_amplicons = []
+    try:
+        if shm_name is None:
+            contig_seqs = ((seq_id, None, seq) for seq_id, seq in read_fasta(fasta_p))
+        else:
+            buf = _attach_shm(shm_name).buf
+            contig_seqs = ((seq_id, offset, buf[offset:offset + length]) for seq_id, offset, length in contigs)
+        for seq_id, offset, seq in contig_seqs:
+            if any(exact):
+                seq = bytes(seq)  # bytes.find needs bytes; copy once per contig
+            seed_hits = find_seeded_matches(seq, seed_index, matchers, [L for _, L in primers]) if seed_index else {}
+            # primers without usable seeds fall back to a full scan
+            f_hits, r_hits = [
+                seed_hits[idx] if idx in seed_hits
+                else find_exact_matches(seq, exact[idx], primers[idx][1]) if exact[idx]
+                else find_approx_matches_jit(seq, prim_bits[idx], max_mismatch, tile_pool, n_tiles) if _NUMBA_AVAILABLE
+                else find_regex_matches(seq, patterns[idx], *primers[idx], max_mismatch) if patterns[idx]
+                else find_generated_matches(seq, matchers[idx], primers[idx][1])
+                for idx in range(len(primers))
+            ]
+            # Two-pointer sweep over end-sorted reverse hits: the valid window only moves right
+            # as fstart0 grows, so each forward hit visits just the reverse hits it pairs with.
+            rev_len = primers[1][1]
+            n_r = len(r_hits)
+            lo = hi = 0
+            for fstart0, fend0, fmism in f_hits:
+                # require forward bind left-of reverse bind on + strand, within the length bounds
+                min_end = fstart0 + max(min_len, rev_len)
+                max_end = fstart0 + max_len
+                while lo < n_r and r_hits[lo][1] < min_end:
+                    lo += 1
+                hi = max(hi, lo)
+                while hi < n_r and r_hits[hi][1] <= max_end:
+                    hi += 1
+                for rstart0, rend0, rmism in r_hits[lo:hi]:
+                    amp_len = rend0 - fstart0
+                    result_amplicons.append({
+                        'pair_id': pair_id,
+                        'sample_name': sample_name,
+                        'fasta_file': fasta_p.name,
+                        'seq_id': seq_id,
+                        'seq_offset': offset,
+                        'fwd_start_1based': fstart0 + 1,
+                        'fwd_end_1based': fend0,
+                        'rev_start_1based': rstart0 + 1,
+                        'rev_end_1based': rend0,
+                        'fwd_mismatches': fmism,
+                        'rev_mismatches': rmism,
+                        'amplicon_length': amp_len,
+                        'fwd_primer': fwd_pr,
+                        'rev_primer': rev_pr
+                    })
+                    if offset is None:
+                        result_amplicons[-1]['amplicon_sequence'] = bytes(seq[fstart0:rend0])
+    except Exception as e:
+        # don't crash worker on one bad fasta; return what we have plus note
+        result_amplicons.append({
+            'pair_id': pair_id,
+            'error': f"Error reading {fasta_path}: {e}"
+        })
+    return (pair_id, sample_name, result_amplicons)
 
-    for fasta_path in fasta_paths:
-        fasta_p = Path(fasta_path)
-        sample_name = fasta_p.stem
-        try:
-            for seq_id, seq in read_fasta(fasta_p):
-                seq = seq.upper()
-                f_hits = find_approx_matches(seq, fwd_pr, max_mismatch)
-                r_hits = find_approx_matches(seq, revrc, max_mismatch)
-                for fstart0, fend0, fmism in f_hits:
-                    for rstart0, rend0, rmism in r_hits:
-                        # require forward bind left-of reverse bind on + strand
-                        if fstart0 <= rstart0:
-                            amp_len = rend0 - fstart0
-                            if amp_len < min_len or amp_len > max_len:
-                                continue
-                            amplicon_seq = seq[fstart0:rend0]
-                            result_amplicons.append({
-                                'pair_id': pair_id,
-                                'sample_name': sample_name,
-                                'fasta_file': fasta_p.name,
-                                'seq_id': seq_id,
-                                'fwd_start_1based': fstart0 + 1,
-                                'fwd_end_1based': fend0,
-                                'rev_start_1based': rstart0 + 1,
-                                'rev_end_1based': rend0,
-                                'fwd_mismatches': fmism,
-                                'rev_mismatches': rmism,
-                                'amplicon_length': amp_len,
-                                'amplicon_sequence': amplicon_seq,
-                                'fwd_primer': fwd_pr,
-                                'rev_primer': rev_pr
-                            })
-        except Exception as e:
-            # don't crash worker on one bad fasta; return what we have plus note
-            result_amplicons.append({
-                'pair_id': pair_id,
-                'error': f"Error reading {fasta_path}: {e}"
-            })
-    return (pair_id, result_amplicons)
+def _process_task_chunk(tasks: List[Tuple]):
+    """Run process_pair_on_file over [(pair_idx, fasta_entry), ...] in one worker round trip."""
+    return [process_pair_on_file(pair_idx, fasta_entry) for pair_idx, fasta_entry in tasks]
 
 # -------------------------
 # Main runner (master process)
@@ -191,82 +707,137 @@ def run_parallel(fasta_dir: Path, primer_csv: Path, out_dir: Path,
                  max_mismatch: int = 2, min_len: int = 20, max_len: int = 20000,
                  workers: int = None):
     primers = parse_primer_csv(primer_csv)
-    fasta_paths = sorted([str(p) for p in fasta_dir.iterdir() if p.is_file() and p.suffix.lower() in ('.fa', '.fasta', '.fna', '.ffn')])
+    # os.scandir reuses the directory entry's cached type, avoiding a stat() per file
+    with os.scandir(fasta_dir) as it:
+        fasta_paths = sorted(e.path for e in it
+                             if e.is_file() and os.path.splitext(e.name)[1].lower() in FASTA_EXTENSIONS)
     if not fasta_paths:
         raise SystemExit(f"No FASTA files found in {fasta_dir}")
 
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # default workers -> all CPUs
-    if workers is None:
+    # default workers (None or 0) -> all CPUs
+    if not workers:
         workers = os.cpu_count() or 1
 
-    # Submit one task per primer pair
-    tasks = []
-    with ProcessPoolExecutor(max_workers=workers) as ex:
-        futures = {ex.submit(process_pair, pair, fasta_paths, max_mismatch, min_len, max_len): pair for pair in primers}
-        for fut in as_completed(futures):
-            pair = futures[fut]
-            try:
-                pair_id, amplicons = fut.result()
-            except Exception as e:
-                print(f"[ERROR] pair {pair['pair_id']} failed: {e}")
-                continue
+    if _NUMBA_AVAILABLE:
+        _warmup_jit()
 
-            # Filter and collect only valid amplicon dicts
-            valid_amplicons = [a for a in amplicons if 'amplicon_sequence' in a]
+    # One seed automaton per pair covers both primers, so each contig is seed-scanned once per pair
+    primer_masks = [pair_masks(pair) for pair in primers]
+    seed_indexes = [build_seed_automaton(pm, max_mismatch) for pm in primer_masks]
+    params = {'max_mismatch': max_mismatch, 'min_len': min_len, 'max_len': max_len}
+    # spare cores (fewer workers than CPUs) go to threaded tiling of long contigs in the JIT kernel
+    params['jit_threads'] = min(_MAX_JIT_THREADS, (os.cpu_count() or 1) // workers) if _NUMBA_AVAILABLE else 1
 
-            # Write per-pair multifasta
-            safe = safe_name(pair_id)
-            out_fa = out_dir / f"{safe}_amplicons.fasta"
-            with open(out_fa, 'w') as fh:
-                # group hits by sample_name to number them per sample (optional)
-                counters = {}
-                for hit in valid_amplicons:
-                    sample = hit['sample_name']
-                    counters.setdefault(sample, 0)
-                    counters[sample] += 1
-                    hit_idx = counters[sample]
-
-                    # header: <pair>_<sample>_hit<N>|len=<amp_len>|fwd=<forward>|rev=<reverse>
-                    header = f"{pair_id}_{sample}_hit{hit_idx}|len={hit['amplicon_length']}|fwd={hit['fwd_primer']}|rev={hit['rev_primer']}"
-                    fh.write(f">{header}\n")
-                    fh.write(wrap_seq(hit['amplicon_sequence']) + "\n")
-            print(f"Wrote {len(valid_amplicons)} amplicons -> {out_fa}")
-
-            # Append to a combined summary CSV data structure
-            # We'll write summary after loop to ensure ordering / single file.
-            tasks.append((pair_id, valid_amplicons))
-
-    # After all pairs processed, produce a single summary CSV
-    summary_rows = []
-    for pair_id, amps in tasks:
-        for a in amps:
-            summary_rows.append({
-                'pair_id': pair_id,
-                'fasta_file': a.get('fasta_file', ''),
-                'sample_name': a.get('sample_name', ''),
-                'seq_id': a.get('seq_id', ''),
-                'fwd_start_1based': a.get('fwd_start_1based', ''),
-                'fwd_end_1based': a.get('fwd_end_1based', ''),
-                'rev_start_1based': a.get('rev_start_1based', ''),
-                'rev_end_1based': a.get('rev_end_1based', ''),
-                'fwd_mismatches': a.get('fwd_mismatches', ''),
-                'rev_mismatches': a.get('rev_mismatches', ''),
-                'amplicon_length': a.get('amplicon_length', ''),
-                'fwd_primer': a.get('fwd_primer', ''),
-                'rev_primer': a.get('rev_primer', '')
-            })
+    # pin workers to NUMA nodes only when there is more than one node to choose from
+    node_cpus = numa_node_cpus()
+    if len(node_cpus) > 1:
+        worker_counter = multiprocessing.Value('i', 0)
+    else:
+        node_cpus, worker_counter = None, None
 
+    # Submit one task per (primer pair, FASTA file) so all workers stay busy even with few pairs.
+    # FASTA files are parsed by the master into shared blocks and scanned one block at a time: the next
+    # block's tasks are queued before the current block's results are drained, and each block is unlinked
+    # as soon as its tasks are done, so at most two blocks sit in /dev/shm.
+    # Primers and automata are shipped once per worker via the initializer.
+    per_pair = defaultdict(list)
     summary_csv = out_dir / "amplicons_summary.csv"
     fieldnames = ['pair_id','fasta_file','sample_name','seq_id',
                   'fwd_start_1based','fwd_end_1based','rev_start_1based','rev_end_1based',
                   'fwd_mismatches','rev_mismatches','amplicon_length','fwd_primer','rev_primer']
-    with open(summary_csv, 'w', newline='') as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in summary_rows:
-            writer.writerow(r)
+    pending_writes = deque()
+    with open(summary_csv, 'w', newline='') as summary_fh, \
+            ThreadPoolExecutor(max_workers=1) as file_writer, \
+            shared_fasta_store(fasta_paths) as (batches, release_block), \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(primers, primer_masks, seed_indexes, params,
+                                          worker_counter, node_cpus)) as ex:
+        queued = deque()
+        n_files = 0
+        for batch in itertools.chain(batches, [None]):
+            if batch is not None:
+                shm, files = batch
+                # Longest-processing-time first: order the block's tasks by estimated work (primer length
+                # x genome length) so the big ones start early and small ones fill the tail. Consecutive
+                # tasks share a round trip up to 1/(8*workers) of the block's work, so the big ones at the
+                # head go out alone and spread over the workers while the small tail is batched.
+                genome_lens = [sum(length for _, _, length in contigs) for _, _, contigs in files]
+                pair_lens = [len(pair['forward']) + len(pair['reverse']) for pair in primers]
+                tasks = sorted(((pair_idx, file_idx) for pair_idx in range(len(primers))
+                                for file_idx in range(len(files))),
+                               key=lambda t: -pair_lens[t[0]] * genome_lens[t[1]])
+                work = [pair_lens[pair_idx] * genome_lens[file_idx] for pair_idx, file_idx in tasks]
+                futures = [ex.submit(_process_task_chunk, [(pair_idx, files[file_idx]) for pair_idx, file_idx in chunk])
+                           for chunk in chunk_tasks(tasks, work, max(sum(work) / (8 * workers), 1))]
+                results = itertools.chain.from_iterable(f.result() for f in futures)
+                queued.append((shm, n_files, tasks, results))
+                n_files += len(files)
+            # drain the previous block (after the last one, everything left) and release its shared memory
+            while len(queued) > (batch is not None):
+                shm, first_file, tasks, results = queued.popleft()
+                for (pair_idx, file_idx), (_, _, amplicons) in zip(tasks, results):
+                    for a in amplicons:
+                        if 'error' in a:
+                            print(f"[ERROR] {a['pair_id']}: {a['error']}")
+                            continue
+                        # slice the amplicon out of the shared block while it is still live
+                        seq = a.pop('amplicon_sequence', None)
+                        if seq is None:
+                            start = a['seq_offset'] + a['fwd_start_1based'] - 1
+                            seq = bytes(shm.buf[start:start + a['amplicon_length']])
+                        per_pair[pair_idx].append((first_file + file_idx, a, seq))
+                release_block(shm)
+        if not n_files:
+            raise SystemExit(f"No readable FASTA files in {fasta_dir}")
+
+        summary_writer = csv.writer(summary_fh)
+        summary_writer.writerow(fieldnames)
+        for pair_idx, pair in enumerate(primers):
+            # restore FASTA order before writing (sort is stable, so hits keep their order within a file)
+            pair_id = pair['pair_id']
+            valid_amplicons = sorted(per_pair.pop(pair_idx, []), key=lambda t: t[0])
+
+            # Write per-pair multifasta
+            safe = safe_name(pair_id)
+            out_fa = out_dir / f"{safe}_amplicons.fasta"
+            # build the whole file in memory and write it with a single call
+            buf = bytearray()
+            # group hits by sample_name to number them per sample (optional)
+            counters = {}
+            for _, hit, seq in valid_amplicons:
+                sample = hit['sample_name']
+                counters.setdefault(sample, 0)
+                counters[sample] += 1
+                hit_idx = counters[sample]
+
+                # header: <pair>_<sample>_hit<N>|len=<amp_len>|fwd=<forward>|rev=<reverse>
+                header = f"{pair_id}_{sample}_hit{hit_idx}|len={hit['amplicon_length']}|fwd={hit['fwd_primer']}|rev={hit['rev_primer']}"
+                buf += b'>'
+                buf += header.encode()
+                buf += b'\n'
+                for i in range(0, len(seq), 80):
+                    buf += seq[i:i + 80]
+                    buf += b'\n'
+            # hand the write to the writer thread (bounded backlog) and keep building the next pair
+            write = file_writer.submit(write_bytes, out_fa, buf)
+            write.add_done_callback(functools.partial(_report_write, out_fa, len(valid_amplicons)))
+            pending_writes.append(write)
+            if len(pending_writes) > _MAX_PENDING_WRITES:
+                pending_writes.popleft().result()
+
+            # Stream this pair's rows into the summary CSV
+            summary_writer.writerows(
+                (pair_id, a['fasta_file'], a['sample_name'], a['seq_id'],
+                 a['fwd_start_1based'], a['fwd_end_1based'], a['rev_start_1based'], a['rev_end_1based'],
+                 a['fwd_mismatches'], a['rev_mismatches'], a['amplicon_length'], a['fwd_primer'], a['rev_primer'])
+                for _, a, _ in valid_amplicons)
+
+        # surface any write errors before reporting success
+        for w in pending_writes:
+            w.result()
+
     print(f"Wrote summary -> {summary_csv}")
 
 # -------------------------